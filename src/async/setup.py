@@ -9,8 +9,8 @@ FULL_VERSION = '2.3.0'
 def read(filename):
     return open(os.path.join(os.path.dirname(__file__), filename)).read()
 
-if (sys.version_info[:2] < (2, 7)) or (sys.version_info[0] == 3 and sys.version_info[:2] < (3, 3)):
-    print('stompest requires Python version 2.7, 3.3 or later (%s detected).' % '.'.join(sys.version_info[:2]))
+if sys.version_info[:2] < (3, 5):
+    print('stompest.async requires Python version 3.5 or later (%s detected).' % '.'.join(map(str, sys.version_info[:2])))
     sys.exit(-1)
 
 setup(
@@ -31,7 +31,7 @@ setup(
         'stompest==%s' % FULL_VERSION
         , 'twisted >= 16.4.0'
     ],
-    tests_require=['mock'] if sys.version_info[0] == 2 else [],
+    python_requires='>=3.5',
     test_suite='stompest.async.tests',
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -40,7 +40,6 @@ setup(
         'Operating System :: OS Independent',
         'License :: OSI Approved :: Apache Software License',
         'Intended Audience :: Developers',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
@@ -43,6 +43,9 @@ from stompest.asynchronous.protocol import StompProtocolCreator
 
 LOG_CATEGORY = __name__
 
+# hoisted to module level: looked up once per received MESSAGE frame
+_MESSAGE_ID_HEADER = StompSpec.MESSAGE_ID_HEADER
+
 connected = checkattr('_protocol')
 
 class Stomp(object):
@@ -67,14 +70,20 @@ class Stomp(object):
 
         self.log = logging.getLogger(LOG_CATEGORY)
 
-        self._handlers = {
-            'MESSAGE': self._onMessage,
-            'CONNECTED': self._onConnected,
-            'ERROR': self._onError,
-            'RECEIPT': self._onReceipt,
-        }
+        # the session never changes, so its hot methods are bound once here
+        self._sessionMessage = self._session.message
+        self._sessionSubscription = self._session.subscription
+
+        # indexed by StompFrame.code (cf. StompSpec.COMMAND_CODES)
+        self._handlers = (
+            self._onMessage,
+            self._onConnected,
+            self._onError,
+            self._onReceipt,
+        )
 
         self._listeners = []
+        self._protocol = None
 
     #
     # interface
@@ -103,12 +112,8 @@ class Stomp(object):
 
     @property
     def _protocol(self):
-        try:
-            protocol = self.__protocol
-        except AttributeError:
-            self._protocol = None
-            return self._protocol
-        if not protocol:
+        protocol = self.__protocol
+        if protocol is None:
             raise StompConnectionError('Not connected')
         return protocol
 
@@ -116,14 +121,13 @@ class Stomp(object):
     def _protocol(self, protocol):
         self.__protocol = protocol
 
-    @defer.inlineCallbacks
     def sendFrame(self, frame):
         """Send a raw STOMP frame.
 
         .. note :: If we are not connected, this method, and all other API commands for sending STOMP frames except :meth:`~.async.client.Stomp.connect`, will raise a :class:`~.StompConnectionError`. Use this command only if you have to bypass the :class:`~.StompSession` logic and you know what you're doing!
         """
         self._protocol.send(frame)
-        yield self._notify(lambda l: l.onSend(self, frame))
+        return self._notify('onSend', frame)
 
     @property
     def session(self):
@@ -146,11 +150,7 @@ class Stomp(object):
 
         .. seealso :: The :mod:`.protocol.failover` and :mod:`~.protocol.session` modules for the details of subscription replay and failover transport.
         """
-        try:
-            self._protocol
-        except:
-            pass
-        else:
+        if self.__protocol is not None:
             raise StompConnectionError('Already connected')
 
         for listener in self._listenersFactory():
@@ -165,7 +165,7 @@ class Stomp(object):
         try:
             frame = self.session.connect(self._config.login, self._config.passcode, headers, versions, host, heartBeats)
             self.sendFrame(frame)
-            yield self._notify(lambda l: l.onConnect(self, frame, connectedTimeout))
+            yield self._notify('onConnect', frame, connectedTimeout)
         except Exception as e:
             self.disconnect(reason=e)
             yield self.disconnected
@@ -186,65 +186,59 @@ class Stomp(object):
         """
         protocol = self._protocol
         try:
-            yield self._notify(lambda l: l.onDisconnect(self, reason, timeout))
+            yield self._notify('onDisconnect', reason, timeout)
             if self.session.state == self.session.CONNECTED:
                 yield self.sendFrame(self.session.disconnect(receipt))
         finally:
             protocol.loseConnection()
 
     @connected
-    @defer.inlineCallbacks
     def send(self, destination, body=b'', headers=None, receipt=None):
         """send(destination, body=b'', headers=None, receipt=None)
 
         Send a **SEND** frame.
         """
-        yield self.sendFrame(self.session.send(destination, body, headers, receipt))
+        return self.sendFrame(self.session.send(destination, body, headers, receipt))
 
     @connected
-    @defer.inlineCallbacks
     def ack(self, frame, receipt=None):
         """ack(frame, receipt=None)
 
         Send an **ACK** frame for a received **MESSAGE** frame.
         """
-        yield self.sendFrame(self.session.ack(frame, receipt))
+        return self.sendFrame(self.session.ack(frame, receipt))
 
     @connected
-    @defer.inlineCallbacks
     def nack(self, frame, receipt=None):
         """nack(frame, receipt=None)
 
         Send a **NACK** frame for a received **MESSAGE** frame.
         """
-        yield self.sendFrame(self.session.nack(frame, receipt))
+        return self.sendFrame(self.session.nack(frame, receipt))
 
     @connected
-    @defer.inlineCallbacks
     def begin(self, transaction=None, receipt=None):
         """begin(transaction=None, receipt=None)
 
         Send a **BEGIN** frame to begin a STOMP transaction.
         """
-        yield self.sendFrame(self.session.begin(transaction, receipt))
+        return self.sendFrame(self.session.begin(transaction, receipt))
 
     @connected
-    @defer.inlineCallbacks
     def abort(self, transaction=None, receipt=None):
         """abort(transaction=None, receipt=None)
 
         Send an **ABORT** frame to abort a STOMP transaction.
         """
-        yield self.sendFrame(self.session.abort(transaction, receipt))
+        return self.sendFrame(self.session.abort(transaction, receipt))
 
     @connected
-    @defer.inlineCallbacks
     def commit(self, transaction=None, receipt=None):
         """commit(transaction=None, receipt=None)
 
         Send a **COMMIT** frame to commit a STOMP transaction.
         """
-        yield self.sendFrame(self.session.commit(transaction, receipt))
+        return self.sendFrame(self.session.commit(transaction, receipt))
 
     @connected
     @defer.inlineCallbacks
@@ -274,79 +268,74 @@ class Stomp(object):
         context = self.session.subscription(token)
         frame = self.session.unsubscribe(token, receipt)
         yield self.sendFrame(frame)
-        yield self._notify(lambda l: l.onUnsubscribe(self, frame, context))
+        yield self._notify('onUnsubscribe', frame, context)
 
     #
     # callbacks for received STOMP frames
     #
     @defer.inlineCallbacks
     def _onFrame(self, frame):
-        yield self._notify(lambda l: l.onFrame(self, frame))
+        yield self._notify('onFrame', frame)
         if not frame:
             defer.returnValue(None)
-        try:
-            handler = self._handlers[frame.command]
-        except KeyError:
+        code = frame.code
+        if code < 0:
             raise StompFrameError('Unknown STOMP command: %s' % repr(frame))
-        yield handler(frame)
+        yield self._handlers[code](frame)
 
-    @defer.inlineCallbacks
     def _onConnected(self, frame):
         self.session.connected(frame)
-        self.log.info('Connected to stomp broker [session=%s, version=%s]' % (self.session.id, self.session.version))
+        self.log.info('Connected to stomp broker [session=%s, version=%s]', self.session.id, self.session.version)
         self._protocol.setVersion(self.session.version)
-        yield self._notify(lambda l: l.onConnected(self, frame))
+        return self._notify('onConnected', frame)
 
-    @defer.inlineCallbacks
     def _onError(self, frame):
-        yield self._notify(lambda l: l.onError(self, frame))
+        return self._notify('onError', frame)
 
-    @defer.inlineCallbacks
-    def _onMessage(self, frame):
-        headers = frame.headers
-        messageId = headers[StompSpec.MESSAGE_ID_HEADER]
+    @util.asyncToDeferred
+    async def _onMessage(self, frame):
+        messageId = frame.headers[_MESSAGE_ID_HEADER]
 
         try:
-            token = self.session.message(frame)
+            token = self._sessionMessage(frame)
         except:
-            self.log.error('Ignoring message (no handler found): %s [%s]' % (messageId, frame.info()))
-            defer.returnValue(None)
-        context = self.session.subscription(token)
+            self.log.error('Ignoring message (no handler found): %s [%s]', messageId, frame.info())
+            return
+        context = self._sessionSubscription(token)
 
         try:
-            yield self._notify(lambda l: l.onMessage(self, frame, context))
+            await self._notify('onMessage', frame, context)
         except Exception as e:
-            self.log.error('Disconnecting (error in message handler): %s [%s]' % (messageId, frame.info()))
+            self.log.error('Disconnecting (error in message handler): %s [%s]', messageId, frame.info())
             self.disconnect(reason=e)
 
-    @defer.inlineCallbacks
     def _onReceipt(self, frame):
         receipt = self.session.receipt(frame)
-        yield self._notify(lambda l: l.onReceipt(self, frame, receipt))
+        return self._notify('onReceipt', frame, receipt)
 
     #
     # private helpers
     #
     @defer.inlineCallbacks
-    def _notify(self, notify):
+    def _notify(self, event, *args):
+        """Dispatch a listener event to all listeners. **event** is the name of an on* handler which is invoked as handler(self, *args); a callable f(listener) is accepted, too, for events whose arguments depend on the listener itself."""
         failed = None
         for listener in list(self._listeners):
             try:
-                yield notify(listener)
+                yield event(listener) if callable(event) else getattr(listener, event)(self, *args)
             except Exception as e:
                 if not failed:
                     failed = e
         if failed:
             raise failed
 
-    @defer.inlineCallbacks
     def _onConnectionLost(self, reason):
         self._protocol = None
-        yield self._notify(lambda l: l.onConnectionLost(self, reason))
+        return self._notify('onConnectionLost', reason)
 
     def _replay(self):
         def replay():
             for (destination, headers, receipt, context) in self.session.replay():
-                self.log.info('Replaying subscription: %s' % headers)
+                self.log.info('Replaying subscription: %s', headers)
                 yield self.subscribe(destination, headers=headers, receipt=receipt, listener=context)
         return task.cooperate(replay()).whenDone()
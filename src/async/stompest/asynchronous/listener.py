@@ -1,16 +1,26 @@
+import inspect
 import logging
 import time
 
-from twisted.internet import defer, reactor, task
+from twisted.internet import defer, task
 from twisted.python import failure
 
+from stompest._backwards import internString
 from stompest.error import StompConnectionError, StompCancelledError, StompProtocolError
 from stompest.protocol import StompSpec
 
-from stompest.asynchronous.util import InFlightOperations, WaitingDeferred, sendToErrorDestination
+from stompest.asynchronous.util import InFlightOperations, WaitingDeferred, asyncToDeferred, sendToErrorDestination
 
 LOG_CATEGORY = __name__
 
+# hoisted to module level: looked up once per received or sent frame
+_ACK_HEADER = StompSpec.ACK_HEADER
+_MESSAGE_ID_HEADER = StompSpec.MESSAGE_ID_HEADER
+_RECEIPT_HEADER = StompSpec.RECEIPT_HEADER
+_CLIENT_ACK_MODES = frozenset(StompSpec.CLIENT_ACK_MODES)
+
+_time = time.time
+
 class Listener(object):
     """This base class defines the interface for the handlers of possible asynchronous STOMP connection events. You may implement any subset of these event handlers and add the resulting listener to the :class:`~.async.client.Stomp` connection.
     """
@@ -60,10 +70,10 @@ class ConnectListener(Listener):
     def onAdd(self, connection): # @UnusedVariable
         self._waiting = None
 
-    @defer.inlineCallbacks
-    def onConnect(self, connection, frame, connectedTimeout): # @UnusedVariable
+    @asyncToDeferred
+    async def onConnect(self, connection, frame, connectedTimeout): # @UnusedVariable
         self._waiting = WaitingDeferred()
-        yield self._waiting.wait(connectedTimeout, StompCancelledError('STOMP broker did not answer on time [timeout=%s]' % connectedTimeout))
+        await self._waiting.wait(connectedTimeout, StompCancelledError('STOMP broker did not answer on time [timeout=%s]' % connectedTimeout))
 
     def onConnected(self, connection, frame): # @UnusedVariable
         connection.remove(self)
@@ -96,7 +106,7 @@ class DisconnectListener(Listener):
         connection.disconnected = defer.Deferred()
 
     def onConnectionLost(self, connection, reason):
-        self.log.info('Disconnected: %s' % reason.getErrorMessage())
+        self.log.info('Disconnected: %s', reason.getErrorMessage())
         if not self._disconnecting:
             self._disconnectReason = StompConnectionError('Unexpected connection loss [%s]' % reason.getErrorMessage())
 
@@ -104,12 +114,10 @@ class DisconnectListener(Listener):
         connection.session.close(flush=not self._disconnectReason)
 
         if self._disconnectReason:
-            if self.log.isEnabledFor(logging.DEBUG):
-                self.log.debug('Calling disconnected errback: %s' % self._disconnectReason)
+            self.log.debug('Calling disconnected errback: %s', self._disconnectReason)
             connection.disconnected.errback(self._disconnectReason)
         else:
-            if self.log.isEnabledFor(logging.DEBUG):
-                self.log.debug('Calling disconnected callback')
+            self.log.debug('Calling disconnected callback')
             connection.disconnected.callback(None)
 
     def onDisconnect(self, connection, reason, timeout): # @UnusedVariable
@@ -117,12 +125,15 @@ class DisconnectListener(Listener):
         if self._disconnecting:
             return
         self._disconnecting = True
-        self.log.info('Disconnecting ...%s' % ((' [reason=%s]' % reason) if reason else ''))
+        if reason:
+            self.log.info('Disconnecting ... [reason=%s]', reason)
+        else:
+            self.log.info('Disconnecting ...')
 
     def onMessage(self, connection, frame, context): # @UnusedVariable
         if not self._disconnecting:
             return
-        self.log.info('Ignoring message (disconnecting): %s [%s]' % (frame.headers[StompSpec.MESSAGE_ID_HEADER], frame.info()))
+        self.log.info('Ignoring message (disconnecting): %s [%s]', frame.headers[_MESSAGE_ID_HEADER], frame.info())
 
     @property
     def _disconnectReason(self):
@@ -133,7 +144,7 @@ class DisconnectListener(Listener):
         if reason is None:
             self.__disconnectReason = reason
         else:
-            self.log.error('Disconnect because of failure: %s' % reason)
+            self.log.error('Disconnect because of failure: %s', reason)
             if self.__disconnectReason is None:
                 self.__disconnectReason = reason
 
@@ -150,20 +161,23 @@ class ReceiptListener(Listener):
         self.log = logging.getLogger(LOG_CATEGORY)
 
     def onConnectionLost(self, connection, reason): # @UnusedVariable
-        for waiting in list(self._receipts.values()):
-            if waiting.called:
-                continue
+        for (_, waiting) in self._receipts.pendingItems():
             waiting.errback(StompCancelledError('Receipt did not arrive (connection lost)'))
 
-    @defer.inlineCallbacks
-    def onSend(self, connection, frame): # @UnusedVariable
+    @asyncToDeferred
+    async def onSend(self, connection, frame): # @UnusedVariable
         if not frame:
-            defer.returnValue(None)
-        receipt = frame.headers.get(StompSpec.RECEIPT_HEADER)
+            return
+        receipt = frame.headers.get(_RECEIPT_HEADER)
         if receipt is None:
-            defer.returnValue(None)
-        with self._receipts(receipt, self.log) as receiptArrived:
-            yield receiptArrived.wait(self._timeout, StompCancelledError('Receipt did not arrive on time: %s [timeout=%s]' % (receipt, self._timeout)))
+            return
+        receiptArrived = self._receipts.enter(receipt, self.log)
+        try:
+            await receiptArrived.wait(self._timeout, StompCancelledError('Receipt did not arrive on time: %s [timeout=%s]' % (receipt, self._timeout)))
+        except Exception as e:
+            self._receipts.exit(receipt, e, self.log)
+            raise
+        self._receipts.exit(receipt, log=self.log)
 
     def onReceipt(self, connection, frame, receipt): # @UnusedVariable
         self._receipts[receipt].callback(None)
@@ -189,35 +203,49 @@ class SubscriptionListener(Listener):
         self._errorDestination = errorDestination
         self._onMessageFailed = onMessageFailed or sendToErrorDestination
         self._headers = None
+        self._needsAck = False
         self._messages = InFlightOperations('Handler for message')
         self.log = logging.getLogger(LOG_CATEGORY)
 
-    @defer.inlineCallbacks
-    def onDisconnect(self, connection, reason, timeout): # @UnusedVariable
+    @asyncToDeferred
+    async def onDisconnect(self, connection, reason, timeout): # @UnusedVariable
         connection.remove(self)
         if not self._messages:
-            defer.returnValue(None)
-        self.log.info('Waiting for outstanding message handlers to finish ... [timeout=%s]' % timeout)
-        yield self._waitForMessages(timeout)
+            return
+        self.log.info('Waiting for outstanding message handlers to finish ... [timeout=%s]', timeout)
+        await self._waitForMessages(timeout)
         self.log.info('All handlers complete. Resuming disconnect ...')
 
-    @defer.inlineCallbacks
-    def onMessage(self, connection, frame, context):
+    @asyncToDeferred
+    async def onMessage(self, connection, frame, context):
         """onMessage(connection, frame, context)
-        
+
         Handle a message originating from this listener's subscription."""
         if context is not self:
             return
-        with self._messages(frame.headers[StompSpec.MESSAGE_ID_HEADER], self.log) as waiting:
+        # message-ids are short ascii strings -- interning them makes the
+        # in-flight dict hash and compare them by identity
+        messageId = internString(frame.headers[_MESSAGE_ID_HEADER])
+        self._messages.enter(messageId, self.log)
+        try:
             try:
-                yield self._handler(connection, frame)
+                # synchronous handlers (the common case for lightweight consumers)
+                # return a plain value -- awaiting that would bounce through the
+                # trampoline for nothing, so only genuine awaitables are awaited
+                result = self._handler(connection, frame)
+                if inspect.isawaitable(result):
+                    await result
             except Exception as e:
-                yield self._onMessageFailed(connection, e, frame, self._errorDestination)
+                result = self._onMessageFailed(connection, e, frame, self._errorDestination)
+                if inspect.isawaitable(result):
+                    await result
             finally:
-                if self._ack and (self._headers[StompSpec.ACK_HEADER] in StompSpec.CLIENT_ACK_MODES):
-                    yield connection.ack(frame)
-                if not waiting.called:
-                    waiting.callback(None)
+                if self._needsAck:
+                    await connection.ack(frame)
+        except Exception as e:
+            self._messages.exit(messageId, e, self.log)
+            raise
+        self._messages.exit(messageId, log=self.log)
 
     def onSubscribe(self, connection, frame, context): # @UnusedVariable
         """Set the **ack** header of the **SUBSCRIBE** frame initiating this listener's subscription to the value of the class atrribute :attr:`DEFAULT_ACK_MODE` (if it isn't set already). Keep a copy of the headers for handling messages originating from this subscription."""
@@ -225,18 +253,20 @@ class SubscriptionListener(Listener):
             return
         if self._headers is not None: # already subscribed
             return
-        frame.headers.setdefault(StompSpec.ACK_HEADER, self.DEFAULT_ACK_MODE)
+        frame.headers.setdefault(_ACK_HEADER, self.DEFAULT_ACK_MODE)
         self._headers = frame.headers
+        # invariant for the lifetime of the subscription, so decide it here rather than once per message
+        self._needsAck = self._ack and (self._headers.get(_ACK_HEADER) in _CLIENT_ACK_MODES)
 
-    @defer.inlineCallbacks
-    def onUnsubscribe(self, connection, frame, context): # @UnusedVariable
+    @asyncToDeferred
+    async def onUnsubscribe(self, connection, frame, context): # @UnusedVariable
         """onUnsubscribe(connection, frame, context)
-        
+
         Forget everything about this listener's subscription and unregister from the **connection**."""
         if context is not self:
             return
         connection.remove(self)
-        yield self._waitForMessages(None)
+        await self._waitForMessages(None)
 
     def onConnectionLost(self, connection, reason): # @UnusedVariable
         """onConnectionLost(connection, reason)
@@ -245,21 +275,31 @@ class SubscriptionListener(Listener):
         connection.remove(self)
 
     def _waitForMessages(self, timeout):
-        return task.cooperate(handler.wait(timeout, StompCancelledError('Handlers did not finish in time.')) for handler in list(self._messages.values())).whenDone()
+        # all handlers wait concurrently, so this fires after max(timeouts), not
+        # their sum; the first failure (a handler timing out) propagates to the
+        # caller as before, while the remaining waits don't log unhandled errors
+        waits = defer.DeferredList([handler.wait(timeout, StompCancelledError('Handlers did not finish in time.')) for handler in tuple(self._messages.values())], fireOnOneErrback=True, consumeErrors=True)
+        return waits.addErrback(lambda failure: failure.value.subFailure)
 
 class HeartBeatListener(Listener):
     """Handles heart-beating.
     
-    :param thresholds: tolerance thresholds (relative to the negotiated heart-beat periods). The default :obj:`None` is equivalent to the content of the class atrribute :attr:`DEFAULT_HEART_BEAT_THRESHOLDS`. Example: ``{'client': 0.6, 'server' 2.5}`` means that the client will send a heart-beat if it had shown no activity for 60 % of the negotiated client heart-beat period and that the client will disconnect if the server has shown no activity for 250 % of the negotiated server heart-beat period.
+    :param thresholds: tolerance thresholds (relative to the negotiated heart-beat periods). The default :obj:`None` is equivalent to the content of the class atrribute :attr:`DEFAULT_HEART_BEAT_THRESHOLDS`. Example: ``{'client': 0.6, 'server' 2.5}`` means that the client will send a heart-beat every 60 % of the negotiated client heart-beat period (whether or not it has shown activity in between --- a heart-beat is just an EOL on the wire) and that the client will disconnect once the server has shown no activity for 250 % of the negotiated server heart-beat period. The server's activity is checked once per negotiated server heart-beat period, so the disconnect may lag the threshold by up to one such period.
 
     """
     DEFAULT_THRESHOLDS = {'client': 0.8, 'server': 2.0}
 
     def __init__(self, thresholds=None):
         self._thresholds = thresholds or self.DEFAULT_THRESHOLDS
+        self._clientThreshold = self._thresholds['client']
+        self._serverThreshold = self._thresholds['server']
         self._heartBeats = {}
+        self._heartBeatFrame = None
 
     def onConnected(self, connection, frame): # @UnusedVariable
+        # a heart-beat frame is stateless (a single EOL on the wire), so one
+        # instance is created per connection and reused for every beat
+        self._heartBeatFrame = connection.session.clientHeartBeat and connection.session.beat()
         self._beats(connection)
 
     def onConnectionLost(self, connection, reason): # @UnusedVariable
@@ -273,35 +313,57 @@ class HeartBeatListener(Listener):
         connection.session.sent()
 
     def _beats(self, connection):
-        for which in ('client', 'server'):
-            self._beat(connection, which)
+        self._beat(connection, 'client')
+        self._beat(connection, 'server')
 
     def _beat(self, connection, which):
-        try:
-            self._heartBeats.pop(which).cancel()
-        except:
-            pass
+        loop = self._heartBeats.pop(which, None)
+        if (loop is not None) and loop.running:
+            loop.stop()
         if not connection:
             return
-        remaining = self._beatRemaining(connection.session, which)
-        if remaining < 0:
+        session = connection.session
+        if which == 'client':
+            heartBeat = session.clientHeartBeat
+            threshold = self._clientThreshold
+        else:
+            heartBeat = session.serverHeartBeat
+            threshold = self._serverThreshold
+        if not heartBeat:
             return
-        if not remaining:
-            if which == 'client':
-                connection.sendFrame(connection.session.beat())
-                remaining = self._beatRemaining(connection.session, which)
-            else:
-                connection.disconnect(reason=StompConnectionError('Server heart-beat timeout'))
-                return
-        self._heartBeats[which] = reactor.callLater(remaining, self._beat, connection, which) # @UndefinedVariable
+        # a single repeating LoopingCall recycles its DelayedCall, so the
+        # reactor's timed-call heap isn't churned on every tick
+        loop = task.LoopingCall(self._tick, connection, which)
+        self._heartBeats[which] = loop
+        interval = heartBeat / 1000.0
+        if which == 'client':
+            interval *= threshold
+        # the server loop ticks once per negotiated period (not per scaled
+        # threshold), so a dead server is detected at most one period after
+        # the threshold is exceeded
+        loop.start(interval, now=False)
+
+    def _tick(self, connection, which):
+        if which == 'client':
+            # beating unconditionally is spec-compliant (a beat is just an EOL)
+            # and cheaper than rescheduling the timer upon every sent frame
+            return connection.sendFrame(self._heartBeatFrame)
+        if not self._beatRemaining(connection.session, 'server'):
+            self._beat(None, 'server')
+            connection.disconnect(reason=StompConnectionError('Server heart-beat timeout'))
 
     def _beatRemaining(self, session, which):
-        heartBeat = {'client': session.clientHeartBeat, 'server': session.serverHeartBeat}[which]
+        if which == 'client':
+            heartBeat = session.clientHeartBeat
+            last = session.lastSent
+            threshold = self._clientThreshold
+        else:
+            heartBeat = session.serverHeartBeat
+            last = session.lastReceived
+            threshold = self._serverThreshold
         if not heartBeat:
             return -1
-        last = {'client': session.lastSent, 'server': session.lastReceived}[which]
-        elapsed = time.time() - last
-        return max((self._thresholds[which] * heartBeat / 1000.0) - elapsed, 0)
+        return max((threshold * heartBeat / 1000.0) - (_time() - last), 0)
 
 def defaultListeners():
     return [ConnectListener(), DisconnectListener(), ErrorListener(), HeartBeatListener()]
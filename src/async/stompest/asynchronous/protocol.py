@@ -3,9 +3,10 @@ import logging
 from twisted.internet import defer, reactor, task
 from twisted.internet.protocol import Factory, Protocol
 
-from stompest._backwards import binaryType
 from stompest.protocol import StompFailoverTransport, StompParser
 
+from stompest.asynchronous.util import asyncToDeferred
+
 LOG_CATEGORY = __name__
 
 class StompProtocol(Protocol):
@@ -13,6 +14,7 @@ class StompProtocol(Protocol):
     # twisted.internet.Protocol interface overrides
     #
     def connectionLost(self, reason):
+        del self._encodeBuffer[:]
         try:
             self._onConnectionLost(reason)
         finally:
@@ -26,12 +28,14 @@ class StompProtocol(Protocol):
             try:
                 self._onFrame(frame)
             except Exception as e:
-                self.log.error('Unhandled error in frame handler: %s' % e)
+                self.log.error('Unhandled error in frame handler: %s', e)
 
     def __init__(self, onFrame, onConnectionLost):
         self._onFrame = onFrame
         self._onConnectionLost = onConnectionLost
         self._parser = StompParser()
+        self._encodeBuffer = bytearray()
+        self._flushScheduled = False
 
         # leave the logger public in case the user wants to override it
         self.log = logging.getLogger(LOG_CATEGORY)
@@ -40,12 +44,27 @@ class StompProtocol(Protocol):
     # user interface
     #
     def loseConnection(self):
+        self._flush()
         self.transport.loseConnection()
 
     def send(self, frame):
         if self.log.isEnabledFor(logging.DEBUG):
             self.log.debug('Sending %s' % frame.info())
-        self.transport.write(binaryType(frame))
+        # frames sent in the same reactor iteration (e.g., a batch of acks) are
+        # serialized into one reusable buffer and coalesced into a single
+        # transport write to save syscalls and per-frame bytes allocations
+        frame.writeTo(self._encodeBuffer)
+        if not self._flushScheduled:
+            self._flushScheduled = True
+            reactor.callLater(0, self._flush) # @UndefinedVariable
+
+    def _flush(self):
+        self._flushScheduled = False
+        buffer = self._encodeBuffer
+        if not buffer:
+            return
+        self.transport.write(bytes(buffer))
+        del buffer[:] # keep the buffer's capacity for the next flush
 
     def setVersion(self, version):
         self._parser.version = version
@@ -66,27 +85,31 @@ class StompProtocolCreator(object):
     protocolFactory = StompFactory
     failoverFactory = StompFailoverTransport
 
+    #: Minimum delay (in seconds) between two failover connect attempts. Zero-delay retries would starve the reactor's IO during a reconnect storm, so retries are floored to this value (the very first attempt is not delayed). Tests may override it with 0.
+    failoverMinDelay = 0.01
+
     def __init__(self, uri, endpointFactory):
         self._failover = self.failoverFactory(uri)
         self._endpointFactory = endpointFactory
         self.log = logging.getLogger(LOG_CATEGORY)
 
-    @defer.inlineCallbacks
-    def connect(self, timeout, *args, **kwargs):
-        for (broker, delay) in self._failover:
-            yield self._sleep(delay)
+    @asyncToDeferred
+    async def connect(self, timeout, *args, **kwargs):
+        for (attempt, (broker, delay)) in enumerate(self._failover):
+            await defer.maybeDeferred(self._sleep, max(delay, self.failoverMinDelay) if attempt else delay)
             endpoint = self._endpointFactory(broker, timeout)
             self.log.info('Connecting to %(host)s:%(port)s ...' % broker)
             try:
-                protocol = yield endpoint.connect(self.protocolFactory(*args, **kwargs))
+                protocol = await endpoint.connect(self.protocolFactory(*args, **kwargs))
             except Exception as e:
-                self.log.warning('%s [%s]' % ('Could not connect to %(host)s:%(port)d' % broker, e))
+                error = e
+                self.log.warning('Could not connect to %s:%d [%s]', broker['host'], broker['port'], e)
             else:
-                defer.returnValue(protocol)
-        raise e
+                return protocol
+        raise error
 
     def _sleep(self, delay):
         if not delay:
             return
-        self.log.info('Delaying connect attempt for %d ms' % int(delay * 1000))
+        self.log.info('Delaying connect attempt for %d ms', int(delay * 1000))
         return task.deferLater(reactor, delay, lambda: None)
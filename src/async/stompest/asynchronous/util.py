@@ -1,5 +1,6 @@
 import collections
 import contextlib
+import functools
 
 from twisted.internet import defer, reactor
 from twisted.internet.endpoints import clientFromString
@@ -9,6 +10,13 @@ from stompest.util import cloneFrame
 
 MESSAGE_FAILED_HEADER = 'message-failed'
 
+def asyncToDeferred(f):
+    """Decorator which turns a coroutine function into a function returning a :class:`twisted.internet.defer.Deferred` (via :func:`twisted.internet.defer.ensureDeferred`). Unlike :func:`twisted.internet.defer.inlineCallbacks`, the coroutine is driven by the C-level trampoline, so callers keep getting a Deferred while the per-step generator bookkeeping is avoided."""
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        return defer.ensureDeferred(f(*args, **kwargs))
+    return wrapper
+
 class InFlightOperations(collections.MutableMapping):
     def __init__(self, info):
         self._info = info
@@ -38,26 +46,46 @@ class InFlightOperations(collections.MutableMapping):
 
     @contextlib.contextmanager
     def __call__(self, key, log=None):
-        self[key] = waiting = WaitingDeferred()
-        info = self.info(key)
-        log and log.debug('%s started.' % info)
+        waiting = self.enter(key, log)
         try:
             yield waiting
+        except Exception as e:
+            self.exit(key, e, log)
+            raise
+        self.exit(key, log=log)
+
+    def enter(self, key, log=None):
+        """Register a fresh :class:`WaitingDeferred` under **key** and return it. Together with :meth:`exit`, this is the plain-method alternative to using this object as a context manager -- it spares the context-manager plumbing on hot paths."""
+        self[key] = waiting = WaitingDeferred()
+        log and log.debug('%s started.' % self.info(key))
+        return waiting
+
+    def exit(self, key, error=None, log=None):
+        """Unregister the operation **key**. Its :class:`WaitingDeferred` is errbacked with **error** (if given) or calledback (otherwise), unless it has fired already."""
+        waiting = self.pop(key)
+        if error is None:
             if not waiting.called:
                 waiting.callback(None)
-        except Exception as e:
-            log and log.error('%s failed [%s]' % (info, e))
+            log and log.debug('%s complete.' % self.info(key))
+        else:
+            log and log.error('%s failed [%s]' % (self.info(key), error))
             if not waiting.called:
-                waiting.errback(e)
-            raise
-        finally:
-            self.pop(key)
-        log and log.debug('%s complete.' % info)
+                waiting.errback(error)
 
     def info(self, key):
         return ' '.join(map(str, filter(None, (self._info, key))))
 
+    def pendingItems(self):
+        """Iterate over the (key, waiting Deferred) pairs whose Deferred has not fired yet. The keys are snapshotted up front, so it is safe to fire (and thereby pop) the pending operations while iterating."""
+        waiting = self._waiting
+        for key in tuple(waiting):
+            value = waiting.get(key)
+            if (value is not None) and (not value.called):
+                yield (key, value)
+
 class WaitingDeferred(defer.Deferred):
+    __slots__ = () # no attributes beyond the base class -- keep it that way, one instance lives per in-flight operation
+
     @defer.inlineCallbacks
     def wait(self, timeout=None, fail=None):
         if timeout is not None:
@@ -10,4 +10,5 @@ def nextMethod(iterator):
 
 binaryType = str if _PY2 else bytes # @UndefinedVariable
 characterType = str if _PY2 else chr # @UndefinedVariable
+internString = intern if _PY2 else sys.intern # @UndefinedVariable
 textType = unicode if _PY2 else str # @UndefinedVariable
@@ -4,6 +4,8 @@ from stompest._backwards import binaryType, textType
 from stompest.protocol.spec import StompSpec
 from stompest.protocol.util import escape
 
+_commandCode = StompSpec.COMMAND_CODES.get
+
 class StompFrame(object):
     u"""This object represents a STOMP frame.
     
@@ -56,12 +58,22 @@ class StompFrame(object):
     def __init__(self, command, headers=None, body=b'', rawHeaders=None, version=None):
         self.version = version
         self.command = command
+        #: Integer dispatch code of the frame's command --- one of the values of :attr:`StompSpec.COMMAND_CODES <.StompSpec.COMMAND_CODES>` for server commands, and -1 for all other commands. Clients may index a handler table with it instead of hashing the :attr:`command` string for every received frame.
+        self.code = _commandCode(command, -1)
         self.headers = {} if headers is None else headers
         self.body = body
         self.rawHeaders = rawHeaders
 
     def __bytes__(self):
-        return b''.join([self._encode(StompSpec.LINE_DELIMITER.join(self._headlines)), self.body, self._encode(StompSpec.FRAME_DELIMITER)])
+        buffer = bytearray()
+        self.writeTo(buffer)
+        return bytes(buffer)
+
+    def writeTo(self, buffer):
+        """Append the wire-level representation of this frame to **buffer** (a :class:`bytearray`). Equivalent to ``buffer += bytes(frame)``, but without allocating an intermediate bytes object per frame -- senders may serialize many frames into one reusable buffer."""
+        buffer += self._encode(StompSpec.LINE_DELIMITER.join(self._headlines))
+        buffer += self.body
+        buffer += self._encode(StompSpec.FRAME_DELIMITER)
 
     def __eq__(self, other):
         """Two frames are considered equal if, and only if, they render the same wire-level frame, that is, if their string representation is identical."""
@@ -159,6 +171,10 @@ class StompHeartBeat(object):
     def __bytes__(self):
         return StompSpec.LINE_DELIMITER.encode()
 
+    def writeTo(self, buffer):
+        """Append the wire-level representation of this heart-beat to **buffer** (a :class:`bytearray`)."""
+        buffer += StompSpec.LINE_DELIMITER.encode()
+
     def __nonzero__(self):
         return self.__bool__()
 
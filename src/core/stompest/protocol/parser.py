@@ -1,6 +1,7 @@
 import collections
 import re
 
+from stompest._backwards import internString
 from stompest.error import StompFrameError
 
 from stompest.protocol.frame import StompFrame, StompHeartBeat
@@ -122,7 +123,7 @@ class StompParser(object):
             if line[-1:] == self._stripLineDelimiter:
                 line = line[:-1]
             if command is None:
-                command = line
+                command = internString(line)
                 if command not in self._commands:
                     self._raise('Invalid command (version %s): %r' % (self.version, command))
                 _unescape = unescape(self.version, command)
@@ -133,7 +134,7 @@ class StompParser(object):
                 name, value = line.split(StompSpec.HEADER_SEPARATOR, 1)
             except ValueError:
                 self._raise('No separator in header line: %r' % line)
-            rawHeaders.append((_unescape(name), _unescape(value)))
+            rawHeaders.append((internString(_unescape(name)), _unescape(value)))
         self._frame = StompFrame(command=command, rawHeaders=rawHeaders, version=self.version)
         self._start = endOfHead
         try:
@@ -134,9 +134,7 @@ class StompSession(object):
         """Create an **UNSUBSCRIBE** frame and lose track of the subscription assiocated to it."""
         self.__check('unsubscribe', [self.CONNECTED])
         frame = stompest.protocol.commands.unsubscribe(token, receipt, version=self.version)
-        try:
-            self._subscriptions.pop(token)
-        except KeyError:
+        if self._subscriptions.pop(token, None) is None:
             raise StompProtocolError('No such subscription [%s=%s]' % token)
         self._receipt(receipt)
         return frame
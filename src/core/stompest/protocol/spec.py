@@ -1,3 +1,4 @@
+from stompest._backwards import internString
 from stompest.error import StompProtocolError
 
 class StompSpec(object):
@@ -47,6 +48,11 @@ class StompSpec(object):
         , VERSION_1_2: {CONNECTED, ERROR, MESSAGE, RECEIPT}
     }
 
+    # integer dispatch codes for the server commands (cf. the :attr:`~.StompFrame.code`
+    # attribute of the :class:`~.StompFrame` class) -- clients may index a handler table
+    # with them instead of hashing the command string on every received frame
+    COMMAND_CODES = {MESSAGE: 0, CONNECTED: 1, ERROR: 2, RECEIPT: 3}
+
     COMMANDS = dict(CLIENT_COMMANDS)
     for (version, commands) in SERVER_COMMANDS.items():
         COMMANDS.setdefault(version, set()).update(commands)
@@ -77,30 +83,32 @@ class StompSpec(object):
     FRAME_DELIMITER = '\x00'
     HEADER_SEPARATOR = ':'
 
-    ACCEPT_VERSION_HEADER = 'accept-version'
-    ACK_HEADER = 'ack'
-    CONTENT_LENGTH_HEADER = 'content-length'
-    CONTENT_TYPE_HEADER = 'content-type'
-    DESTINATION_HEADER = 'destination'
-    HEART_BEAT_HEADER = 'heart-beat'
-    HOST_HEADER = 'host'
-    ID_HEADER = 'id'
-    LOGIN_HEADER = 'login'
-    MESSAGE_ID_HEADER = 'message-id'
-    PASSCODE_HEADER = 'passcode'
-    RECEIPT_HEADER = 'receipt'
-    RECEIPT_ID_HEADER = 'receipt-id'
-    SELECTOR_HEADER = 'selector'
-    SESSION_HEADER = 'session'
-    SERVER_HEADER = 'server'
-    SUBSCRIPTION_HEADER = 'subscription'
-    TRANSACTION_HEADER = 'transaction'
-    VERSION_HEADER = 'version'
+    # the header names are interned so that lookups of parsed headers (whose names are
+    # interned, too) hit the dict's identity fast path
+    ACCEPT_VERSION_HEADER = internString('accept-version')
+    ACK_HEADER = internString('ack')
+    CONTENT_LENGTH_HEADER = internString('content-length')
+    CONTENT_TYPE_HEADER = internString('content-type')
+    DESTINATION_HEADER = internString('destination')
+    HEART_BEAT_HEADER = internString('heart-beat')
+    HOST_HEADER = internString('host')
+    ID_HEADER = internString('id')
+    LOGIN_HEADER = internString('login')
+    MESSAGE_ID_HEADER = internString('message-id')
+    PASSCODE_HEADER = internString('passcode')
+    RECEIPT_HEADER = internString('receipt')
+    RECEIPT_ID_HEADER = internString('receipt-id')
+    SELECTOR_HEADER = internString('selector')
+    SESSION_HEADER = internString('session')
+    SERVER_HEADER = internString('server')
+    SUBSCRIPTION_HEADER = internString('subscription')
+    TRANSACTION_HEADER = internString('transaction')
+    VERSION_HEADER = internString('version')
 
     ACK_AUTO = 'auto'
     ACK_CLIENT = 'client'
     ACK_CLIENT_INDIVIDUAL = 'client-individual'
-    CLIENT_ACK_MODES = {ACK_CLIENT, ACK_CLIENT_INDIVIDUAL}
+    CLIENT_ACK_MODES = frozenset((ACK_CLIENT, ACK_CLIENT_INDIVIDUAL))
 
     HEART_BEAT_SEPARATOR = ','
 
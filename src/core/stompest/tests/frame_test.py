@@ -136,6 +136,15 @@ lines\x00""" % (StompSpec.SEND, StompSpec.DESTINATION_HEADER)).encode())
             frame.version = version
             self.assertEqual(binaryType(frame), frameBytes)
 
+    def test_write_to(self):
+        from stompest.protocol.frame import StompHeartBeat
+        frame = StompFrame(StompSpec.MESSAGE, {'content-length': '4'}, b'\xf0\x00\x0a\x09')
+        buffer = bytearray(b'SPAM')
+        frame.writeTo(buffer)
+        self.assertEqual(buffer, bytearray(b'SPAM' + binaryType(frame)))
+        StompHeartBeat().writeTo(buffer)
+        self.assertEqual(buffer, bytearray(b'SPAM' + binaryType(frame) + b'\n'))
+
     def test_frame_info(self):
         frame = StompFrame(StompSpec.MESSAGE, headers={'a': 'c'}, body=b'More text than fits a short info.', version=StompSpec.VERSION_1_1)
         self.assertEqual(frame.info().replace("b'", "'").replace("u'", "'"), "MESSAGE frame [headers={'a': 'c'}, body='More text than fits ...', version=1.1]")